@@ -6,6 +6,8 @@ appropriate conditionals.
 
 __all__ = ("DepSet", "stringify_boolean")
 
+from sys import intern
+
 from snakeoil.compatibility import IGNORED_EXCEPTIONS
 from snakeoil.iterables import expandable_chain
 from snakeoil.sequences import iflatten_instance
@@ -60,6 +62,8 @@ class DepSet(boolean.AndRestriction):
 
         raw_conditionals = []
         depsets = [restrictions]
+        # the frame currently being filled, i.e. depsets[-1]
+        frame = restrictions
 
         node_conds = False
         words = iter(dep_str.split())
@@ -74,32 +78,38 @@ class DepSet(boolean.AndRestriction):
                     # no elements == error. if closures don't map up,
                     # indexerror would be chucked from trying to pop
                     # the frame so that is addressed.
-                    if not depsets[-1] or not raw_conditionals:
+                    if not frame or not raw_conditionals:
                         raise DepsetParseError(dep_str, attr=attr)
-                    elif raw_conditionals[-1] in operators:
-                        if len(depsets[-1]) == 1:
-                            depsets[-2].append(depsets[-1][0])
+                    parent = depsets[-2]
+                    if raw_conditionals[-1] in operators:
+                        if len(frame) == 1:
+                            parent.append(frame[0])
                         else:
-                            depsets[-2].append(
-                                operators[raw_conditionals[-1]](*depsets[-1]))
+                            parent.append(
+                                operators[raw_conditionals[-1]](*frame))
                     else:
                         node_conds = True
                         c = raw_conditionals[-1]
+                        # USE flag names repeat heavily across depsets,
+                        # intern them to share the strings
                         if c[0] == "!":
-                            c = values.ContainmentMatch(c[1:-1], negate=True)
+                            c = values.ContainmentMatch(
+                                intern(c[1:-1]), negate=True)
                         else:
-                            c = values.ContainmentMatch(c[:-1])
+                            c = values.ContainmentMatch(intern(c[:-1]))
 
-                        depsets[-2].append(
-                            packages.Conditional("use", c, tuple(depsets[-1])))
+                        parent.append(
+                            packages.Conditional("use", c, tuple(frame)))
 
                     raw_conditionals.pop()
                     depsets.pop()
+                    frame = parent
 
                 elif "(" == k:
                     k = ''
                     # push another frame on
-                    depsets.append([])
+                    frame = []
+                    depsets.append(frame)
                     raw_conditionals.append(k)
 
                 elif k[-1] == '?' or k in operators:
@@ -111,7 +121,8 @@ class DepSet(boolean.AndRestriction):
                         raise DepsetParseError(dep_str, k2, attr=attr)
 
                     # push another frame on
-                    depsets.append([])
+                    frame = []
+                    depsets.append(frame)
                     raw_conditionals.append(k)
 
                 elif "|" in k:
@@ -120,18 +131,18 @@ class DepSet(boolean.AndRestriction):
                     try:
                         k2 = next(words)
                     except StopIteration:
-                        depsets[-1].append(element_func(k))
+                        frame.append(element_func(k))
                     else:
                         if k2 != '->':
-                            depsets[-1].append(element_func(k))
+                            frame.append(element_func(k))
                             words.appendleft((k2,))
                         else:
                             k3 = next(words)
                             # file rename
-                            depsets[-1].append(element_func(k, k3))
+                            frame.append(element_func(k, k3))
                 else:
                     # node/element
-                    depsets[-1].append(element_func(k))
+                    frame.append(element_func(k))
 
         except IGNORED_EXCEPTIONS:
             raise
@@ -7,8 +7,6 @@ atom exceptions
 
 __all__ = ("MalformedAtom", "InvalidVersion", "InvalidCPV", "DepsetParseError")
 
-import textwrap
-
 from ..exceptions import PkgcoreException
 from ..package import errors
 
@@ -101,14 +99,10 @@ class RequiredUseError(SanityCheckError):
 
     def msg(self, verbosity=0, prefix='  '):
         header = f'>>> {self.pkg.cpvstr}: failed REQUIRED_USE'
-        errors = []
+        # only the unmatched node differs between entries
+        required_use = f'{prefix}from: {self.pkg.required_use}'
+        use = f"{prefix}for USE: {' '.join(sorted(self.pkg.use))}"
+        msg = [header]
         for node in self.unmatched:
-            errors.append(textwrap.dedent(
-                f"""
-                Failed to match: {node}
-                from: {self.pkg.required_use}
-                for USE: {' '.join(sorted(self.pkg.use))}
-                """
-            ))
-        msg = [f'{prefix}{line}' for e in errors for line in e.strip().splitlines()]
-        return '\n'.join([header] + msg)
+            msg.extend((f'{prefix}Failed to match: {node}', required_use, use))
+        return '\n'.join(msg)
@@ -9,14 +9,19 @@ __all__ = (
 
 import fnmatch
 import os
+import re
+from functools import lru_cache
+from itertools import chain
 
 from snakeoil.bash import read_bash_dict
 from snakeoil.fileutils import AtomicWriteFile
+from snakeoil.mappings import LazyValDict
 from snakeoil.osutils import listdir_files, normpath, pjoin
-from snakeoil.sequences import iflatten_instance, stable_unique
+from snakeoil.sequences import stable_unique
 
 from .. import os_data
 from ..fs import livefs
+from ..fs.contents import contentsSet
 from ..merge import const, errors, triggers
 from ..restrictions import values
 from ..system import libtool
@@ -33,7 +38,26 @@ incrementals = frozenset([
 ])
 
 
-def collapse_envd(base):
+_colon_split_re = re.compile(r'[^:]+')
+
+def _hook_envd_cache(engine):
+    """Return the env.d parse cache shared by the triggers of the running hook.
+
+    Several triggers collapse env.d within a single hook; the merge itself may
+    change env.d between hooks so the cache never outlives one.
+    """
+    hook_cache = getattr(engine, 'hook_cache', None)
+    if hook_cache is None:
+        return None
+    return hook_cache.setdefault('envd', {})
+
+
+def collapse_envd(base, cache=None):
+    """Collapse the env.d files in a directory.
+
+    :param cache: optional dict mapping file paths to their parsed content,
+        reused and filled in as files are read
+    """
     collapsed_d = {}
     try:
         env_d_files = sorted(listdir_files(base))
@@ -44,7 +68,13 @@ def collapse_envd(base):
             if x.endswith(".bak") or x.endswith("~") or x.startswith("._cfg") \
                     or len(x) <= 2 or not x[0:2].isdigit():
                 continue
-            d = read_bash_dict(pjoin(base, x))
+            path = pjoin(base, x)
+            if cache is None:
+                d = read_bash_dict(path)
+            else:
+                d = cache.get(path)
+                if d is None:
+                    d = cache[path] = read_bash_dict(path)
             # inefficient, but works.
             for k, v in d.items():
                 collapsed_d.setdefault(k, []).append(v)
@@ -76,11 +106,9 @@ def collapse_envd(base):
             collapsed_d[k] = v[-1]
             continue
         if k in loc_colon_parsed:
-            collapsed_d[k] = [_f for _f in iflatten_instance(
-                x.split(':') for x in v) if _f]
+            collapsed_d[k] = _colon_split_re.findall(':'.join(v))
         else:
-            collapsed_d[k] = [_f for _f in iflatten_instance(
-                x.split() for x in v) if _f]
+            collapsed_d[k] = ' '.join(v).split()
 
     return collapsed_d, loc_incrementals, loc_colon_parsed
 
@@ -102,13 +130,13 @@ def update_ldso(ld_search_path, offset='/'):
     fp = pjoin(offset, 'etc', 'ld.so.conf')
     new_f = AtomicWriteFile(
         fp, uid=os_data.root_uid, gid=os_data.root_uid, perms=0o644)
-    new_f.write("# automatically generated, edit env.d files instead\n")
-    new_f.writelines(x.strip()+"\n" for x in ld_search_path)
+    new_f.write("# automatically generated, edit env.d files instead\n" +
+                ''.join([x.strip() + "\n" for x in ld_search_path]))
     new_f.close()
 
 
-def perform_env_update(root, skip_ldso_update=False):
-    d, inc, colon = collapse_envd(pjoin(root, "etc/env.d"))
+def perform_env_update(root, skip_ldso_update=False, envd_cache=None):
+    d, inc, colon = collapse_envd(pjoin(root, "etc/env.d"), envd_cache)
 
     l = d.pop("LDPATH", None)
     if l is not None and not skip_ldso_update:
@@ -119,14 +147,15 @@ def perform_env_update(root, skip_ldso_update=False):
     new_f = AtomicWriteFile(
         pjoin(root, "etc", "profile.env"),
         uid=os_data.root_uid, gid=os_data.root_gid, perms=0o644)
-    new_f.write("# autogenerated.  update env.d instead\n")
-    new_f.writelines(f'export {k}="{d[k]}"\n' for k in sorted(d))
+    keys = sorted(d)
+    new_f.write("# autogenerated.  update env.d instead\n" +
+                ''.join([f'export {k}="{d[k]}"\n' for k in keys]))
     new_f.close()
     new_f = AtomicWriteFile(
         pjoin(root, "etc", "profile.csh"),
         uid=os_data.root_uid, gid=os_data.root_gid, perms=0o644)
-    new_f.write("# autogenerated, update env.d instead\n")
-    new_f.writelines(f'setenv {k}="{d[k]}"\n' for k in sorted(d))
+    new_f.write("# autogenerated, update env.d instead\n" +
+                ''.join([f'setenv {k}="{d[k]}"\n' for k in keys]))
     new_f.close()
 
 
@@ -137,51 +166,80 @@ class env_update(triggers.base):
     _hooks = ('post_unmerge', 'post_merge')
 
     def trigger(self, engine):
-        perform_env_update(engine.offset)
+        perform_env_update(engine.offset, envd_cache=_hook_envd_cache(engine))
+
+
+def _chksum_size(obj):
+    """Return the size chksum of a file entry without forcing lazy chksums.
+
+    Lazily computed chksums are all generated at once on first access, so
+    the size of a locally backed file is pulled via stat instead.
+    """
+    chksums = obj.chksums
+    if not isinstance(chksums, LazyValDict):
+        return chksums.get("size")
+    if "size" in chksums:
+        path = getattr(obj.data, "path", None)
+        if path is not None:
+            try:
+                return os.stat(path).st_size
+            except OSError:
+                pass
+    return None
 
 
 def simple_chksum_compare(x, y):
-    found = False
-    for k, v in x.chksums.items():
-        if k == "size":
-            continue
-        o = y.chksums.get(k)
-        if o is not None:
-            if o != v:
-                return False
-            found = True
-    if "size" in x.chksums and "size" in y.chksums:
-        return x.chksums["size"] == y.chksums["size"]
-    return found
-
-
-def gen_config_protect_filter(offset, extra_protects=(), extra_disables=()):
-    collapsed_d, inc, colon = collapse_envd(pjoin(offset, "etc/env.d"))
+    # differing sizes can be detected without hashing either file
+    x_size = _chksum_size(x)
+    if x_size is not None:
+        y_size = _chksum_size(y)
+        if y_size is not None and x_size != y_size:
+            return False
+
+    x_chksums, y_chksums = x.chksums, y.chksums
+    common = set(x_chksums.keys()).intersection(y_chksums.keys())
+    size = "size" in common
+    common.discard("size")
+    for k in common:
+        if x_chksums[k] != y_chksums[k]:
+            return False
+    if size:
+        return x_chksums["size"] == y_chksums["size"]
+    return bool(common)
+
+
+@lru_cache(maxsize=1024)
+def _protect_prefix(path):
+    return normpath(path).rstrip("/") + "/"
+
+
+def gen_config_protect_filter(offset, extra_protects=(), extra_disables=(),
+                              envd_cache=None):
+    collapsed_d, inc, colon = collapse_envd(pjoin(offset, "etc/env.d"), envd_cache)
     collapsed_d.setdefault("CONFIG_PROTECT", []).extend(extra_protects)
     collapsed_d.setdefault("CONFIG_PROTECT_MASK", []).extend(extra_disables)
 
-    r = [values.StrGlobMatch(normpath(x).rstrip("/") + "/")
-         for x in set(stable_unique(collapsed_d["CONFIG_PROTECT"] + ["/etc"]))]
+    protect = dict.fromkeys(map(
+        _protect_prefix, chain(collapsed_d["CONFIG_PROTECT"], ("/etc",))))
+    r = [values.StrGlobMatch(x) for x in protect]
     if len(r) > 1:
         r = values.OrRestriction(*r)
     else:
         r = r[0]
-    neg = stable_unique(collapsed_d["CONFIG_PROTECT_MASK"])
+    neg = list(dict.fromkeys(map(
+        _protect_prefix, collapsed_d["CONFIG_PROTECT_MASK"])))
     if neg:
         if len(neg) == 1:
-            r2 = values.StrGlobMatch(normpath(neg[0]).rstrip("/") + "/",
-                                     negate=True)
+            r2 = values.StrGlobMatch(neg[0], negate=True)
         else:
             r2 = values.OrRestriction(
-                negate=True,
-                *[values.StrGlobMatch(normpath(x).rstrip("/") + "/")
-                  for x in set(neg)])
+                negate=True, *[values.StrGlobMatch(x) for x in neg])
         r = values.AndRestriction(r, r2)
     return r
 
 
-def gen_collision_ignore_filter(offset, extra_ignores=()):
-    collapsed_d, inc, colon = collapse_envd(pjoin(offset, "etc/env.d"))
+def gen_collision_ignore_filter(offset, extra_ignores=(), envd_cache=None):
+    collapsed_d, inc, colon = collapse_envd(pjoin(offset, "etc/env.d"), envd_cache)
     ignored = collapsed_d.setdefault("COLLISION_IGNORE", [])
     ignored.extend(extra_ignores)
     ignored.extend(["*/.keep", "*/.keep_*"])
@@ -216,47 +274,51 @@ class ConfigProtectInstall(triggers.base):
 
     def trigger(self, engine, existing_cset, install_cset):
         # hackish, but it works.
+        envd_cache = _hook_envd_cache(engine)
         protected_filter = gen_config_protect_filter(
-            engine.offset, self.extra_protects, self.extra_disables).match
-        ignore_filter = gen_collision_ignore_filter(engine.offset).match
+            engine.offset, self.extra_protects, self.extra_disables,
+            envd_cache=envd_cache).match
+        ignore_filter = gen_collision_ignore_filter(
+            engine.offset, envd_cache=envd_cache).match
         protected = {}
 
         for x in existing_cset.iterfiles():
             if not ignore_filter(x.location) and protected_filter(x.location):
                 replacement = install_cset[x]
                 if not simple_chksum_compare(replacement, x):
-                    protected.setdefault(
-                        pjoin(engine.offset,
-                              os.path.dirname(x.location).lstrip(os.path.sep)),
-                        []).append((os.path.basename(replacement.location),
-                                    replacement))
+                    dirname, _, basename = x.location.rpartition(os.path.sep)
+                    protected.setdefault(dirname, []).append((basename, replacement))
+
+        # join the offset once per directory rather than per protected file
+        protected = {
+            pjoin(engine.offset, dirname.lstrip(os.path.sep)): entries
+            for dirname, entries in protected.items()}
 
         for dir_loc, entries in protected.items():
             updates = {x[0]: [] for x in entries}
             try:
-                existing = sorted(x for x in listdir_files(dir_loc)
-                                  if x.startswith("._cfg"))
+                with os.scandir(dir_loc) as it:
+                    for x in it:
+                        name = x.name
+                        # ._cfg0000_filename
+                        if not name.startswith("._cfg") or name[9:10] != "_":
+                            continue
+                        l = updates.get(name[10:])
+                        if l is None or not x.is_file():
+                            continue
+                        try:
+                            l.append((int(name[5:9]), name))
+                        except ValueError:
+                            continue
             except FileNotFoundError:
                 # this shouldn't occur.
                 continue
 
-            for x in existing:
-                try:
-                    # ._cfg0000_filename
-                    count = int(x[5:9])
-                    if x[9] != "_":
-                        raise ValueError
-                    fn = x[10:]
-                except (ValueError, IndexError):
-                    continue
-                if fn in updates:
-                    updates[fn].append((count, fn))
-
             # now we rename.
             for fname, entry in entries:
                 # check for any updates with the same chksums.
                 count = 0
-                for cfg_count, cfg_fname in updates[fname]:
+                for cfg_count, cfg_fname in sorted(updates[fname]):
                     if simple_chksum_compare(livefs.gen_obj(
                             pjoin(dir_loc, cfg_fname)), entry):
                         count = cfg_count
@@ -300,8 +362,11 @@ class ConfigProtectUninstall(triggers.base):
     _hooks = ('pre_unmerge',)
 
     def trigger(self, engine, existing_cset, uninstall_cset):
-        protected_filter = gen_config_protect_filter(engine.offset).match
-        ignore_filter = gen_collision_ignore_filter(engine.offset).match
+        envd_cache = _hook_envd_cache(engine)
+        protected_filter = gen_config_protect_filter(
+            engine.offset, envd_cache=envd_cache).match
+        ignore_filter = gen_collision_ignore_filter(
+            engine.offset, envd_cache=envd_cache).match
 
         remove = []
         for x in existing_cset.iterfiles():
@@ -398,31 +463,25 @@ class FileCollision(triggers.base):
             return
 
         # for the moment, we just care about files
-        colliding = existing.difference(install.iterdirs())
+        dirs = {x.location for x in install.iterdirs()}
 
         # hackish, but it works.
+        envd_cache = _hook_envd_cache(engine)
         protected_filter = gen_config_protect_filter(
-            engine.offset, self.extra_protects, self.extra_disables).match
+            engine.offset, self.extra_protects, self.extra_disables,
+            envd_cache=envd_cache).match
         ignore_filter = gen_collision_ignore_filter(
-            engine.offset, self.extra_ignores).match
-
-        ignores = []
-        for x in colliding:
-            if protected_filter(x.location) or ignore_filter(x.location):
-                ignores.append(x)
+            engine.offset, self.extra_ignores, envd_cache=envd_cache).match
 
-        colliding.difference_update(ignores)
-        if not colliding:
-            return
-
-        # Wipe the references since we may throw an exception- we don't want
-        # potentially millions of references being kept in memory for heavy
-        # ignore matches.
-        del ignores, protected_filter, ignore_filter
-        colliding.difference_update(old_cset)
+        # single pass; cheap membership checks go first so the regex based
+        # filters only run against entries that would otherwise collide.
+        colliding = [
+            x for x in existing
+            if x.location not in dirs and x not in old_cset
+            and not protected_filter(x.location) and not ignore_filter(x.location)]
 
         if colliding:
-            self.collision(colliding)
+            self.collision(contentsSet(colliding))
 
 
 class CollisionProtect(FileCollision):
@@ -525,7 +584,7 @@ class InfoRegen(triggers.InfoRegen):
 
     @property
     def locations(self):
-        collapsed_d = collapse_envd(self.path)[0]
+        collapsed_d = collapse_envd(self.path, _hook_envd_cache(self.engine))[0]
         l = collapsed_d.get("INFOPATH", ())
         if not l:
             return triggers.InfoRegen.locations
@@ -691,15 +750,13 @@ class GenerateTriggers:
         l = []
         for x in self.opts["INSTALL_MASK"]:
             x = x.rstrip("/")
-            l.append(values.StrRegex(fnmatch.translate(x)))
-            l.append(values.StrRegex(fnmatch.translate(f"{x}/*")))
-        install_mask = l
+            l.append(fnmatch.translate(x))
+            l.append(fnmatch.translate(f"{x}/*"))
 
-        if install_mask:
-            if len(install_mask) == 1:
-                install_mask = install_mask[0]
-            else:
-                install_mask = values.OrRestriction(*install_mask)
+        if l:
+            # collapse all masks into a single alternation so each pruning
+            # check is one regex search instead of one per pattern
+            install_mask = values.StrRegex('|'.join(l))
             yield triggers.PruneFiles(install_mask.match)
             # note that if this wipes all /usr/share/ entries, should
             # wipe the empty dir.
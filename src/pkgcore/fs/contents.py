@@ -52,6 +52,19 @@ class contentsSet(metaclass=generic_equality):
             self._dict.update(check_instance(x) for x in initial)
         self.mutable = mutable
 
+    @classmethod
+    def _from_trusted(cls, iterable, mutable=True):
+        """
+        build a set from fs objs known to be valid, skipping the instance checks
+
+        :param iterable: fs objs, as yielded by the livefs walkers
+        :param mutable: controls if it modifiable after initialization
+        """
+        obj = cls()
+        obj._dict.update((x.location, x) for x in iterable)
+        obj.mutable = mutable
+        return obj
+
     def __str__(self):
         name = self.__class__.__name__
         contents = ', '.join(map(str, self))
@@ -77,6 +77,22 @@ class fsBase:
                 s(self, k, v)
     gen_doc_additions(__init__, __attrs__)
 
+    @classmethod
+    def _from_stat(cls, location, st):
+        """create an instance directly from a stat result
+
+        Internal fast path for :py:func:`pkgcore.fs.livefs.gen_obj`, skipping
+        the keyword handling of ``__init__``.
+        """
+        self = object.__new__(cls)
+        s = object.__setattr__
+        s(self, "location", normpath(location))
+        s(self, "mtime", st.st_mtime)
+        s(self, "mode", stat.S_IMODE(st.st_mode))
+        s(self, "uid", st.st_uid)
+        s(self, "gid", st.st_gid)
+        return self
+
     def change_attributes(self, **kwds):
         d = {x: getattr(self, x)
              for x in self.__attrs__ if hasattr(self, x)}
@@ -173,6 +189,18 @@ class fsFile(fsBase):
         fsBase.__init__(self, location, **kwds)
     gen_doc_additions(__init__, __slots__)
 
+    @classmethod
+    def _from_stat(cls, location, st, data, chf_types=None):
+        self = super()._from_stat(location, st)
+        s = object.__setattr__
+        s(self, "data", data)
+        s(self, "dev", st.st_dev)
+        s(self, "inode", st.st_ino)
+        if chf_types is None:
+            chf_types = tuple(get_handlers())
+        s(self, "chksums", _LazyChksums(chf_types, self._chksum_callback))
+        return self
+
     def __repr__(self):
         return f"file:{self.location}"
 
@@ -227,6 +255,12 @@ class fsLink(fsBase):
         fsBase.__init__(self, location, **kwargs)
     gen_doc_additions(__init__, __slots__)
 
+    @classmethod
+    def _from_stat(cls, location, st, target):
+        self = super()._from_stat(location, st)
+        object.__setattr__(self, "target", target)
+        return self
+
     def change_attributes(self, **kwds):
         d = {x: getattr(self, x)
              for x in self.__attrs__ if hasattr(self, x)}
@@ -300,6 +334,17 @@ class fsDev(fsBase):
 
         fsBase.__init__(self, path, **kwds)
 
+    @classmethod
+    def _from_stat(cls, location, st):
+        self = super()._from_stat(location, st)
+        s = object.__setattr__
+        # devices retain the file type bits in their mode
+        s(self, "mode", st.st_mode)
+        major, minor = get_major_minor(st)
+        s(self, "major", major)
+        s(self, "minor", minor)
+        return self
+
     def __repr__(self):
         return f"device:{self.location}"
 
@@ -5,15 +5,16 @@ interaction with the livefs: generating fs objects to represent the livefs.
 import collections
 import errno
 import os
-from stat import S_IMODE, S_ISDIR, S_ISFIFO, S_ISLNK, S_ISREG
+from contextlib import contextmanager
+from stat import S_IFDIR, S_IFIFO, S_IFLNK, S_IFMT, S_IFREG
 
 from snakeoil.chksum import get_handlers
 from snakeoil.data_source import local_source
 from snakeoil.mappings import LazyValDict
-from snakeoil.osutils import listdir, normpath, pjoin
+from snakeoil.osutils import normpath, pjoin
 
 from .contents import contentsSet
-from .fs import fsBase, fsDev, fsDir, fsFifo, fsFile, fsSymlink, get_major_minor
+from .fs import fsBase, fsDev, fsDir, fsFifo, fsFile, fsSymlink
 
 __all__ = ["gen_obj", "scan", "iter_scan", "sorted_scan"]
 
@@ -24,6 +25,36 @@ def gen_chksums(handlers, location):
     return LazyValDict(handlers, f)
 
 
+def _mk_file(path, stat, real_location, chksum_handlers):
+    return fsFile._from_stat(
+        path, stat, local_source(real_location), chksum_handlers)
+
+
+def _mk_dir(path, stat, real_location, chksum_handlers):
+    return fsDir._from_stat(path, stat)
+
+
+def _mk_symlink(path, stat, real_location, chksum_handlers):
+    return fsSymlink._from_stat(path, stat, os.readlink(real_location))
+
+
+def _mk_fifo(path, stat, real_location, chksum_handlers):
+    return fsFifo._from_stat(path, stat)
+
+
+def _mk_dev(path, stat, real_location, chksum_handlers):
+    return fsDev._from_stat(path, stat)
+
+
+# file type -> fs obj factory; anything unlisted is treated as a device
+_obj_factories = {
+    S_IFREG: _mk_file,
+    S_IFDIR: _mk_dir,
+    S_IFLNK: _mk_symlink,
+    S_IFIFO: _mk_fifo,
+}
+
+
 def gen_obj(path, stat=None, chksum_handlers=None, real_location=None,
             stat_func=os.lstat, **overrides):
     """
@@ -46,33 +77,40 @@ def gen_obj(path, stat=None, chksum_handlers=None, real_location=None,
                 raise
             stat = os.lstat(real_location)
 
-    mode = stat.st_mode
-    d = {"mtime":stat.st_mtime, "mode":S_IMODE(mode),
-         "uid":stat.st_uid, "gid":stat.st_gid}
-    if S_ISREG(mode):
-        d["size"] = stat.st_size
-        d["data"] = local_source(real_location)
-        d["dev"] = stat.st_dev
-        d["inode"] = stat.st_ino
-        if chksum_handlers is not None:
-            d["chf_types"] = chksum_handlers
-        d.update(overrides)
-        return fsFile(path, **d)
-
-    d.update(overrides)
-    if S_ISDIR(mode):
-        return fsDir(path, **d)
-    elif S_ISLNK(mode):
-        d["target"] = os.readlink(real_location)
-        return fsSymlink(path, **d)
-    elif S_ISFIFO(mode):
-        return fsFifo(path, **d)
-    else:
-        major, minor = get_major_minor(stat)
-        d["minor"] = minor
-        d["major"] = major
-        d["mode"] = mode
-        return fsDev(path, **d)
+    obj = _obj_factories.get(S_IFMT(stat.st_mode), _mk_dev)(
+        path, stat, real_location, chksum_handlers)
+    if overrides:
+        obj = obj.change_attributes(**overrides)
+    return obj
+
+
+@contextmanager
+def _scandir(path):
+    """scandir a directory via an fd
+
+    Entry stat calls then resolve relative to the open directory
+    (fstatat) rather than walking the full path again for every entry.
+    """
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        with os.scandir(fd) as it:
+            yield it
+    finally:
+        os.close(fd)
+
+
+def _entry_stat(entry, stat_func=os.lstat):
+    """stat a :py:class:`os.DirEntry`, mirroring :py:func:`gen_obj` fallbacks
+
+    Reusing the scandir entry avoids re-resolving the full path for each
+    directory member; dangling symlinks fall back to lstat when following.
+    """
+    if stat_func is os.lstat:
+        return entry.stat(follow_symlinks=False)
+    try:
+        return entry.stat(follow_symlinks=True)
+    except FileNotFoundError:
+        return entry.stat(follow_symlinks=False)
 
 
 # hmm. this code is roughly 25x slower then find.
@@ -82,7 +120,8 @@ def gen_obj(path, stat=None, chksum_handlers=None, real_location=None,
 # also, os.path.join is rather slow.
 # in this case, we know it's always pegging one more dir on, so it's
 # fine doing it this way (specially since we're relying on
-# os.path.sep, not '/' :P)
+# os.path.sep, not '/' :P); the separator-terminated prefix is computed
+# once per directory and entries are appended via plain concatenation.
 
 def _internal_iter_scan(path, chksum_handlers, stat_func=os.lstat,
                         hidden=True, backup=True):
@@ -92,19 +131,26 @@ def _internal_iter_scan(path, chksum_handlers, stat_func=os.lstat,
     yield obj
     if not obj.is_dir:
         return
+    # bind the per-entry callables locally; this loop runs once per file
+    # in the tree so global/attribute lookups add up.
+    _gen_obj, _entry_stat_func, push, pop = gen_obj, _entry_stat, dirs.append, dirs.popleft
+    sep = os.path.sep
     while dirs:
-        base = dirs.popleft()
-        for x in listdir(base):
-            if not hidden and x.startswith('.'):
-                continue
-            if not backup and x.endswith('~'):
-                continue
-            path = pjoin(base, x)
-            obj = gen_obj(path, chksum_handlers=chksum_handlers,
-                        real_location=path, stat_func=stat_func)
-            yield obj
-            if obj.is_dir:
-                dirs.append(path)
+        base = pop()
+        prefix = base if base.endswith(sep) else base + sep
+        with _scandir(base) as it:
+            for entry in it:
+                x = entry.name
+                if not hidden and x.startswith('.'):
+                    continue
+                if not backup and x.endswith('~'):
+                    continue
+                path = prefix + x
+                obj = _gen_obj(path, stat=_entry_stat_func(entry, stat_func),
+                               chksum_handlers=chksum_handlers, real_location=path)
+                yield obj
+                if obj.is_dir:
+                    push(path)
 
 
 def _internal_offset_iter_scan(path, chksum_handlers, offset, stat_func=os.lstat,
@@ -114,25 +160,29 @@ def _internal_offset_iter_scan(path, chksum_handlers, offset, stat_func=os.lstat
     dirs = collections.deque([path[len(offset):]])
     if dirs[0]:
         yield gen_obj(dirs[0], chksum_handlers=chksum_handlers,
-            stat_func=stat_func)
+            real_location=path, stat_func=stat_func)
 
     sep = os.path.sep
+    _gen_obj, push, pop = gen_obj, dirs.append, dirs.popleft
     while dirs:
-        base = dirs.popleft()
+        base = pop()
         real_base = pjoin(offset, base.lstrip(sep))
+        real_prefix = real_base if real_base.endswith(sep) else real_base + sep
         base = base.rstrip(sep) + sep
-        for x in listdir(real_base):
-            if not hidden and x.startswith('.'):
-                continue
-            if not backup and x.endswith('~'):
-                continue
-            path = pjoin(base, x)
-            obj = gen_obj(path, chksum_handlers=chksum_handlers,
-                        real_location=pjoin(real_base, x),
-                        stat_func=os.lstat)
-            yield obj
-            if obj.is_dir:
-                dirs.append(path)
+        with _scandir(real_base) as it:
+            for entry in it:
+                x = entry.name
+                if not hidden and x.startswith('.'):
+                    continue
+                if not backup and x.endswith('~'):
+                    continue
+                path = base + x
+                obj = _gen_obj(path, stat=entry.stat(follow_symlinks=False),
+                               chksum_handlers=chksum_handlers,
+                               real_location=real_prefix + x)
+                yield obj
+                if obj.is_dir:
+                    push(path)
 
 
 def iter_scan(path, offset=None, follow_symlinks=False, chksum_types=None,
@@ -195,7 +245,8 @@ def scan(*a, **kw):
     Look at :py:func:`iter_scan` for valid args.
     """
     mutable = kw.pop("mutable", True)
-    return contentsSet(iter_scan(*a, **kw), mutable=mutable)
+    # the walkers only yield fs objs, so skip per entry validation
+    return contentsSet._from_trusted(iter_scan(*a, **kw), mutable=mutable)
 
 class _realpath_dir:
 
@@ -231,25 +282,20 @@ def intersect(cset, realpath=False):
 
 
 def recursively_fill_syms(cset, limiter=fsBase):
-    sym_src = [cset.links()]
-    while sym_src:
-        syms = sym_src.pop(-1)
-        new_syms = []
-        for sym in syms:
-            new_loc = sym.resolved_target
-            if new_loc in cset:
-                continue
-            try:
-                obj = gen_obj(new_loc)
-            except EnvironmentError as e:
-                if e.errno != errno.ENOENT:
-                    raise
-                continue
-            if obj.is_sym:
-                cset.add(obj)
-                new_syms.append(obj)
-            elif isinstance(obj, limiter):
-                cset.add(obj)
-
-        if new_syms:
-            sym_src.append(new_syms)
+    todo = collections.deque(cset.iterlinks())
+    while todo:
+        sym = todo.popleft()
+        new_loc = sym.resolved_target
+        if new_loc in cset:
+            continue
+        try:
+            obj = gen_obj(new_loc)
+        except EnvironmentError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            continue
+        if obj.is_sym:
+            cset.add(obj)
+            todo.append(obj)
+        elif isinstance(obj, limiter):
+            cset.add(obj)
@@ -93,6 +93,8 @@ class MergeEngine:
 
         self.parallelism = parallelism if parallelism is not None else cpu_count()
         self.hooks = ImmutableDict((x, []) for x in hooks)
+        # scratch space triggers may share while a single hook runs
+        self.hook_cache = None
 
         self.preserve_csets = []
         self.cset_sources = {}
@@ -295,6 +297,7 @@ class MergeEngine:
         """Execute any triggers bound to a hook point."""
         try:
             self.phase = hook
+            self.hook_cache = {}
             self.regenerate_csets()
             for trigger in sorted(self.hooks[hook], key=operator.attrgetter("priority")):
                 # error checking needed here.
@@ -327,6 +330,7 @@ class MergeEngine:
                     self.observer.trigger_end(hook, trigger)
         finally:
             self.phase = None
+            self.hook_cache = None
 
     @staticmethod
     def generate_offset_cset(engine, csets, cset_generator):
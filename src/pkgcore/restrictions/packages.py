@@ -229,7 +229,7 @@ class Conditional(PackageRestriction, metaclass=generic_equality):
     def evaluate_conditionals(self, parent_cls, parent_seq, enabled, tristate_locked=None):
         if tristate_locked is not None:
             assert len(self.restriction.vals) == 1
-            val = list(self.restriction.vals)[0]
+            val = next(iter(self.restriction.vals))
             if val in tristate_locked:
                 # if val is forced true, but the check is
                 # negation ignore it
@@ -239,9 +239,21 @@ class Conditional(PackageRestriction, metaclass=generic_equality):
         elif not self.restriction.match(enabled):
             return
 
-        if self.payload:
-            boolean.AndRestriction(*self.payload).evaluate_conditionals(
-                parent_cls, parent_seq, enabled, tristate_locked)
+        # inlined AndRestriction(*self.payload).evaluate_conditionals(); this
+        # runs for every enabled conditional node during depset evaluation
+        # and only needs a real And node when the result can't be collapsed
+        l = []
+        for restrict in self.payload:
+            f = getattr(restrict, 'evaluate_conditionals', None)
+            if f is None:
+                l.append(restrict)
+            else:
+                f(boolean.AndRestriction, l, enabled, tristate_locked)
+        if l:
+            if len(l) == 1 or issubclass(parent_cls, boolean.AndRestriction):
+                parent_seq.extend(l)
+            else:
+                parent_seq.append(boolean.AndRestriction(*l))
 
 
 # "Invalid name" (pylint uses the module const regexp, not the class regexp)
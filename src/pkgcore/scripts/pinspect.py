@@ -20,7 +20,7 @@ from itertools import groupby, islice
 from operator import attrgetter, itemgetter
 
 from snakeoil.cli import arghparse
-from snakeoil.sequences import iflatten_instance, unstable_unique
+from snakeoil.sequences import iflatten_instance
 
 from .. import fetch
 from ..ebuild import inspect_profile
@@ -217,7 +217,8 @@ class license_usage_kls(histo_data):
         data = {}
         pos = 0
         for pos, pkg in enumerate(repo):
-            for license in unstable_unique(iflatten_instance(pkg.license)):
+            # license names are plain strings, dedupe via a set directly
+            for license in set(iflatten_instance(pkg.license)):
                 data.setdefault(license, 0)
                 data[license] += 1
         return data, pos + 1
@@ -416,8 +416,7 @@ def display_failures(out, sequence, first_level=True, debug=False, _color_index=
                 out.write(step)
         out.first_prefix.pop()
     if first_level:
-        for x in range(3):
-            out.first_prefix.pop()
+        del out.first_prefix[_color_index:]
 
 
 def slotatom_if_slotted(repos, checkatom):
@@ -19,7 +19,7 @@ from snakeoil import modules
 from snakeoil.cli import arghparse, tool
 from snakeoil.log import suppress_logging
 from snakeoil.osutils import abspath, normpath, pjoin
-from snakeoil.sequences import iflatten_instance, unstable_unique
+from snakeoil.sequences import iflatten_instance
 from snakeoil.strings import pluralism
 
 from .. import const
@@ -27,7 +27,6 @@ from ..config import load_config
 from ..plugin import get_plugins
 from ..repository import errors as repo_errors
 from ..restrictions import packages, restriction
-from . import parserestrict
 
 
 class StoreTarget(argparse._AppendAction):
@@ -62,10 +61,16 @@ class StoreTarget(argparse._AppendAction):
         super().__init__(*args, **kwargs)
 
     def __call__(self, parser, namespace, values, option_string=None):
+        # deferred since it pulls in the atom/cpv machinery
+        from . import parserestrict
+        parse_match = parserestrict.parse_match
+
         if self.separator is not None:
             values = values.split(self.separator)
-        if self.use_sets:
-            setattr(namespace, self.use_sets, [])
+        use_sets = self.use_sets
+        if use_sets:
+            sets = []
+            setattr(namespace, use_sets, sets)
 
         if isinstance(values, str):
             values = [values]
@@ -77,13 +82,16 @@ class StoreTarget(argparse._AppendAction):
             else:
                 raise argparse.ArgumentError(self, "'-' is only valid when piping data in")
 
-        # override default empty tuple value to appendable list
+        # override default empty tuple value with a fresh list that's filled
+        # in place; going through the append action per token copies the
+        # existing list each time
+        targets = []
         if values:
-            setattr(namespace, self.dest, [])
+            setattr(namespace, self.dest, targets)
 
         for token in values:
-            if self.use_sets and token.startswith('@'):
-                namespace.sets.append(token[1:])
+            if use_sets and token.startswith('@'):
+                sets.append(token[1:])
             else:
                 if self.allow_ebuild_paths and token.endswith('.ebuild'):
                     try:
@@ -110,12 +118,10 @@ class StoreTarget(argparse._AppendAction):
                         raise argparse.ArgumentError(self, e)
                 else:
                     try:
-                        restriction = parserestrict.parse_match(token)
+                        restriction = parse_match(token)
                     except parserestrict.ParseError as e:
                         parser.error(e)
-                super().__call__(
-                    parser, namespace,
-                    (token, restriction), option_string=option_string)
+                targets.append((token, restriction))
 
 
 CONFIG_ALL_DEFAULT = object()
@@ -150,13 +156,15 @@ class StoreConfigObject(argparse._StoreAction):
     @staticmethod
     def _choices(sections):
         """Yield available values for a given option."""
-        for k, v in sections.items():
-            yield k
+        yield from sections.keys()
 
-    def _load_obj(self, sections, name):
+    @property
+    def _obj_type(self):
+        """Object type prefix used in error messages."""
         obj_type = self.metavar if self.metavar is not None else self.config_type
-        obj_type = obj_type.lower() + ' ' if obj_type is not None else ''
+        return obj_type.lower() + ' ' if obj_type is not None else ''
 
+    def _load_obj(self, sections, name):
         try:
             val = sections[name]
         except KeyError:
@@ -165,11 +173,11 @@ class StoreConfigObject(argparse._StoreAction):
                 choices = f" (available: {choices})"
 
             raise argparse.ArgumentError(
-                self, f"couldn't find {obj_type}{name!r}{choices}")
+                self, f"couldn't find {self._obj_type}{name!r}{choices}")
 
         if self.writable and getattr(val, 'frozen', False):
             raise argparse.ArgumentError(
-                self, f"{obj_type}{name!r} is readonly")
+                self, f"{self._obj_type}{name!r} is readonly")
 
         if self.store_name:
             return name, val
@@ -193,12 +201,13 @@ class StoreConfigObject(argparse._StoreAction):
         if self.nargs == argparse.ZERO_OR_MORE and values == []:
             values = list(sections.keys())
 
+        load_obj = self._load_obj
         if values is CONFIG_ALL_DEFAULT:
-            value = [self._load_obj(sections, x) for x in sections]
+            value = [load_obj(sections, x) for x in sections]
         elif isinstance(values, str):
-            value = self._load_obj(sections, values)
+            value = load_obj(sections, values)
         else:
-            value = [self._load_obj(sections, x) for x in values]
+            value = [load_obj(sections, x) for x in values]
         setattr(namespace, self.dest, value)
 
     @staticmethod
@@ -316,7 +325,8 @@ class StoreRepoObject(StoreConfigObject):
 
         If a repo doesn't have a proper location just the name is returned.
         """
-        for repo_name, repo in sorted(unstable_unique(sections.items())):
+        # section names are unique, so sorting never falls back to comparing repos
+        for repo_name, repo in sorted(sections.items()):
             repo_name = getattr(repo, 'repo_id', repo_name)
             if hasattr(repo, 'location'):
                 yield f"{repo_name}:{repo.location}"
@@ -424,7 +434,11 @@ class BooleanQuery(arghparse.DelayedValue):
         if self.converter:
             l = self.converter(l, namespace)
 
-        l = list(iflatten_instance(l, (restriction.base,)))
+        if isinstance(l, restriction.base):
+            # converters typically hand back a single combined restriction
+            l = [l]
+        elif l:
+            l = list(iflatten_instance(l, (restriction.base,)))
 
         if len(l) > 1:
             val = self.klass(*l)
@@ -447,6 +461,7 @@ def make_query(parser, *args, **kwargs):
         del kwargs['type']
     else:
         def query(value):
+            from . import parserestrict
             return parserestrict.parse_match(value)
         kwargs.setdefault("type", query)
     if kwargs.get('metavar', False) is None:
@@ -535,7 +550,8 @@ class ArgumentParser(arghparse.ArgumentParser):
         super().__init__(suppress=suppress, script=script, **kwds)
         self.register('action', 'parsers', _SubParser)
 
-        if not suppress:
+        # subparsers default to neither, skip creating an empty group for them
+        if not suppress and (config or domain):
             config_opts = self.add_argument_group('config options')
             if config:
                 config_opts.add_argument(
@@ -577,6 +593,7 @@ class ArgumentParser(arghparse.ArgumentParser):
 
 def convert_to_restrict(sequence, default=packages.AlwaysTrue):
     """Convert an iterable to a list of atoms, or return the default"""
+    from . import parserestrict
     l = []
     try:
         for x in sequence:
@@ -1,53 +1,70 @@
+import os
 import queue
 import threading
 from collections import deque
-from multiprocessing import cpu_count
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from types import GeneratorType
 
 from snakeoil import klass
-from snakeoil.compatibility import IGNORED_EXCEPTIONS
 
 
-def reclaim_threads(threads):
-    for x in threads:
-        try:
-            x.join()
-        except IGNORED_EXCEPTIONS:
-            raise
-        except Exception as e:
-            # should do something better here
-            pass
+def _usable_cpus():
+    """Number of CPUs this process may run on, honoring affinity masks."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        # platforms lacking sched_getaffinity(), e.g. macOS
+        return os.cpu_count() or 1
+
+
+def reclaim_threads(futures):
+    """Wait for all worker futures, re-raising the first failure seen."""
+    error = None
+    for x in futures:
+        exc = x.exception()
+        if exc is not None and error is None:
+            error = exc
+    if error is not None:
+        raise error
 
 
 def map_async(iterable, functor, *args, **kwds):
-    per_thread_args = kwds.pop("per_thread_args", lambda: ())
-    per_thread_kwds = kwds.pop("per_thread_kwds", lambda: {})
+    per_thread_args = kwds.pop("per_thread_args", None)
+    per_thread_kwds = kwds.pop("per_thread_kwds", None)
     parallelism = kwds.pop("threads", None)
+    batch_size = kwds.pop("batch_size", None)
     if parallelism is None:
-        parallelism = cpu_count()
+        parallelism = _usable_cpus()
 
     if hasattr(iterable, '__len__'):
         # if there are less items than parallelism, don't
         # spawn pointless threads.
         parallelism = max(min(len(iterable), parallelism), 0)
+        if batch_size is None and parallelism:
+            # hand items out in batches to cut queue traffic, while leaving
+            # enough batches per thread to keep the load balanced
+            batch_size = min(64, len(iterable) // (parallelism * 4))
+    batch_size = max(batch_size or 1, 1)
 
     # note we allow an infinite queue since .put below is blocking, and won't
     # return till it succeeds (regardless of signal) as such, we do it this way
     # to ensure the put succeeds, then the keyboardinterrupt can be seen.
-    q = queue.Queue()
+    # SimpleQueue suffices as no task tracking or bounding is needed.
+    q = queue.SimpleQueue()
     results = deque()
     kill = threading.Event()
     kill.clear()
 
     def iter_queue(kill, qlist, empty_signal):
-        while not kill.isSet():
-            item = qlist.get()
-            if item is empty_signal:
+        while not kill.is_set():
+            batch = qlist.get()
+            if batch is empty_signal:
                 return
-            yield item
+            yield from batch
 
-    def worker(*args):
-        result = functor(*args)
+    def worker(*args, **kwds):
+        result = functor(*args, **kwds)
         if result is not None:
             # avoid appending chars from a string into results
             if isinstance(result, GeneratorType):
@@ -55,26 +72,36 @@ def map_async(iterable, functor, *args, **kwds):
             else:
                 results.append(result)
 
-    threads = []
-    for x in range(parallelism):
-        tkwds = kwds.copy()
-        tkwds.update(per_thread_kwds())
-        targs = (iter_queue(kill, q, klass.sentinel),) + args + per_thread_args()
-        threads.append(threading.Thread(target=worker, args=targs, kwargs=tkwds))
-    try:
-        try:
-            for x in threads:
-                x.start()
-            # now we feed the queue.
-            for data in iterable:
-                q.put(data)
-        except Exception:
-            kill.set()
-            raise
-    finally:
-        for x in range(parallelism):
-            q.put(klass.sentinel)
+    def thread_params():
+        # only build per thread copies when per thread values were requested
+        targs = args if per_thread_args is None else args + per_thread_args()
+        tkwds = kwds if per_thread_kwds is None else {**kwds, **per_thread_kwds()}
+        return targs, tkwds
 
-        reclaim_threads(threads)
+    if not parallelism:
+        return results
+
+    futures = []
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        try:
+            try:
+                for x in range(parallelism):
+                    targs, tkwds = thread_params()
+                    futures.append(executor.submit(
+                        worker, iter_queue(kill, q, klass.sentinel), *targs, **tkwds))
+                # now we feed the queue.
+                iterable = iter(iterable)
+                while True:
+                    batch = list(islice(iterable, batch_size))
+                    if not batch:
+                        break
+                    q.put(batch)
+            except Exception:
+                kill.set()
+                raise
+        finally:
+            for x in range(parallelism):
+                q.put(klass.sentinel)
 
+    reclaim_threads(futures)
     return results
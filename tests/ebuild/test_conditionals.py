@@ -1,13 +1,31 @@
+import re
+from functools import partial, partialmethod
+
+import pytest
 from pkgcore.ebuild import conditionals
 from pkgcore.ebuild.atom import atom
 from pkgcore.ebuild.errors import DepsetParseError
 from pkgcore.restrictions import boolean, packages
-from snakeoil.currying import post_curry
-from snakeoil.iterables import expandable_chain
-from snakeoil.sequences import iflatten_instance
 from snakeoil.test import TestCase
 
 
+_DEFAULT_OPS = {"": boolean.AndRestriction, "||": boolean.OrRestriction}
+_AND_ONLY_OPS = {"": boolean.AndRestriction}
+_NODE_TAGS = {boolean.OrRestriction: "||", boolean.AndRestriction: "&&"}
+# collapse whitespace runs and drop explicit '&&' markers from expected output
+_normalize_str = partial(re.compile(r'(?:\s|&&)+').sub, ' ')
+
+
+def _expected_conds(r, element_kls=str):
+    """Convert a node_conds expectation table into its comparable form."""
+    d = {}
+    for k, v in r.items():
+        if isinstance(v, str):
+            v = (v.split(),)
+        d[element_kls(k)] = {frozenset(x) for x in v}
+    return d
+
+
 class base(TestCase):
 
     class kls(conditionals.DepSet):
@@ -19,27 +37,34 @@ class base(TestCase):
         if element_func is not None:
             kwds["element_func"] = element_func
         if operators is None:
-            operators = {"":boolean.AndRestriction, "||":boolean.OrRestriction}
+            operators = _DEFAULT_OPS
         return self.kls.parse(string, element_kls, operators=operators, **kwds)
 
 
-class TestDepSetParsing(base):
+@pytest.mark.parametrize("depset", (
+    "( )", "( a b c", "(a b c )",
+    "( a b c)", "x?( a )",
+    "x? (a )", "x? (a)", "x? ( a b)",
+    "x? ( x? () )", "x? ( x? (a)", "(", ")", "x?",
+    "||(", "||()", "||( )", "|| ()",
+    "|| (", "|| )", "||)",  "|| ( x? ( )",
+    "|| (x )", "|| ( x)",
+    "a|", "a?", "a||b",
+    "x? y", "( x )?", "||?"))
+def test_depset_parse_error(depset):
+    with pytest.raises(DepsetParseError):
+        base.kls.parse(depset, str, operators=_DEFAULT_OPS)
+
 
-    def f(self, x):
-        self.assertRaises(DepsetParseError, self.gen_depset, x)
-
-    # generate a lot of parse error assertions.
-    for idx, x in enumerate(("( )", "( a b c", "(a b c )",
-        "( a b c)", "()", "x?( a )",
-        "?x (a)", "x? (a )", "x? (a)", "x? ( a b)",
-        "x? ( x? () )", "x? ( x? (a)", "(", ")", "x?",
-        "||(", "||()", "||( )", "|| ()",
-        "|| (", "|| )", "||)",  "|| ( x? ( )",
-        "|| ( x?() )", "|| (x )", "|| ( x)",
-        "a|", "a?", "a(b", "a)", "a||b",
-        "a(", "a)b", "x? y", "( x )?", "||?")):
-        locals()["test_DepsetParseError_case%i" % (idx + 1)] = post_curry(f, x)
-    del x
+@pytest.mark.parametrize("depset", (
+    "()", "?x (a)", "|| ( x?() )", "a(b", "a)", "a(", "a)b"))
+def test_depset_parse_error_elements(depset):
+    # syntax glued onto tokens is only caught when the element is parsed
+    with pytest.raises(DepsetParseError):
+        base.kls.parse(depset, atom, operators=_DEFAULT_OPS)
+
+
+class TestDepSetParsing(base):
 
     @staticmethod
     def mangle_cond_payload(p):
@@ -54,35 +79,35 @@ class TestDepSetParsing(base):
                 yield s + y
 
     def flatten_restricts(self, v):
-        i = expandable_chain(v)
-        depth = 0
-        conditionals = []
-        for x in i:
-            for t, s in ((boolean.OrRestriction, "||"),
-                         (boolean.AndRestriction, "&&")):
-                if isinstance(x, t):
-                    yield s
-                    yield "("
-                    i.appendleft(")")
-                    i.appendleft(x.restrictions)
-                    depth += 1
-                    break
+        # explicit stack, pushed in reverse so pops come out in order
+        stack = list(v)
+        stack.reverse()
+        # accumulated conditionals per nesting level, popped on ')'
+        active_conds = [frozenset()]
+        while stack:
+            x = stack.pop()
+            tag = _NODE_TAGS.get(type(x))
+            if tag is not None:
+                yield tag
+                yield "("
+                stack.append(")")
+                stack.extend(reversed(x.restrictions))
+                active_conds.append(active_conds[-1])
+            elif isinstance(x, packages.Conditional):
+                self.assertTrue(x.attr == "use")
+                conds = active_conds[-1].union(
+                    self.mangle_cond_payload(x.restriction))
+                active_conds.append(conds)
+                yield conds
+                yield "("
+                stack.append(")")
+                stack.extend(reversed(x.payload))
             else:
-                if isinstance(x, packages.Conditional):
-                    self.assertTrue(x.attr == "use")
-                    conditionals.insert(
-                        depth, list(self.mangle_cond_payload(x.restriction)))
-                    yield set(iflatten_instance(conditionals[:depth + 1]))
-                    yield "("
-                    i.appendleft(")")
-                    i.appendleft(x.payload)
-                    depth += 1
-                else:
-                    if x == ")":
-                        self.assertTrue(depth)
-                        depth -= 1
-                    yield x
-        self.assertFalse(depth)
+                if x == ")":
+                    self.assertTrue(len(active_conds) > 1)
+                    active_conds.pop()
+                yield x
+        self.assertEqual(len(active_conds), 1)
 
     def check_depset(self, s, func=base.gen_depset):
         if isinstance(s, (list, tuple)):
@@ -111,8 +136,8 @@ class TestDepSetParsing(base):
                     v2.append(x[-1] + '?')
             v = ' '.join(v2)
         else:
-            v = ' '.join(s.split())
-        v = ' '.join(v.replace("&&", "").split())
+            v = s
+        v = _normalize_str(v).strip()
         self.assertEqual(str(func(self, s)), v)
 
     # generate a lot of assertions of parse results.
@@ -137,6 +162,9 @@ class TestDepSetParsing(base):
 
         ("|| ( || ( a b ) )", ["||", "(", "a", "b", ")"]),
 
+        ( "x? ( a ) || ( y? ( b ) c )",
+            (["x"], "(", "a", ")", "||", "(", ["y"], "(", "b", ")", "c", ")")),
+
         "|| ( || ( a b ) c )",
 
         ( "x? ( a !y? ( || ( b c ) d ) e ) f1 f? ( g h ) i",
@@ -147,8 +175,8 @@ class TestDepSetParsing(base):
             )
         )]):
 
-        locals()["test_parse_case%i" % (idx + 1)] = post_curry(check_depset, x)
-        locals()["test_str_case%i" % (idx + 1)] = post_curry(check_str, x)
+        locals()["test_parse_case%i" % (idx + 1)] = partialmethod(check_depset, x)
+        locals()["test_str_case%i" % (idx + 1)] = partialmethod(check_str, x)
 
     def check_known_conditionals(self, text, conditionals, **kwds):
         d = self.gen_depset(text, **kwds)
@@ -166,7 +194,7 @@ class TestDepSetParsing(base):
         ["a b c d e ( f )", ""],
         ["!a? ( b? ( c ) )", "a b"]
         ]):
-        locals()["test_known_conditionals_case%i" % (idx + 1)] = post_curry(
+        locals()["test_known_conditionals_case%i" % (idx + 1)] = partialmethod(
             check_known_conditionals, x, c)
     del x, c
 
@@ -181,13 +209,12 @@ class TestDepSetParsing(base):
 
     def test_element_func(self):
         self.assertEqual(
-            self.gen_depset("asdf fdas", element_func=post_curry(str)).element_class,
+            self.gen_depset("asdf fdas", element_func=partial(str)).element_class,
             "".__class__)
 
     def test_disabling_or(self):
         self.assertRaises(
-            DepsetParseError, self.gen_depset, "|| ( a b )",
-            {"operators":{"":boolean.AndRestriction}})
+            DepsetParseError, self.gen_depset, "|| ( a b )", _AND_ONLY_OPS)
 
     def test_atom_interaction(self):
         self.gen_depset("a/b[x(+)]", element_func=atom)
@@ -221,16 +248,9 @@ class TestDepSetConditionalsInspection(base):
             l.add(frozenset(t))
         return l
 
-    def check_conds(self, s, r, msg=None, element_kls=str, **kwds):
+    def check_conds(self, s, d, msg=None, element_kls=str, **kwds):
         nc = {k: self.flatten_cond(v) for k, v in
               self.gen_depset(s, element_kls=element_kls, **kwds).node_conds.items()}
-        d = {element_kls(k): v for k, v in r.items()}
-        for k, v in d.items():
-            if isinstance(v, str):
-                d[k] = set([frozenset(v.split())])
-            elif isinstance(v, (tuple, list)):
-                d[k] = set(map(frozenset, v))
-
         self.assertEqual(nc, d, msg)
 
     for idx, s in enumerate((
@@ -247,13 +267,16 @@ class TestDepSetConditionalsInspection(base):
          "accessible via non conditional path"),
         ("|| ( y? ( x ) z )", {"x":"y"}),
         )):
-        locals()["test_node_conds_case%i" % (idx + 1)] = post_curry(check_conds, *s)
+        s, r, *msg = s
+        locals()["test_node_conds_case%i" % (idx + 1)] = partialmethod(
+            check_conds, s, _expected_conds(r), *msg)
 
     for idx, s in enumerate((
         ("a/b[c=]", {"a/b[c]":"c", "a/b[-c]":"!c"}),
         )):
-        locals()["test_node_conds_atom_%i" % (idx + 1)] = post_curry(check_conds,
-            element_kls=atom, transitive_use_atoms=True, *s)
+        s, r = s
+        locals()["test_node_conds_atom_%i" % (idx + 1)] = partialmethod(check_conds,
+            s, _expected_conds(r, atom), element_kls=atom, transitive_use_atoms=True)
 
 
 class TestDepSetEvaluate(base):
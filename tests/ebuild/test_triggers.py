@@ -0,0 +1,245 @@
+import textwrap
+from types import SimpleNamespace
+
+import pytest
+
+from pkgcore.ebuild import triggers
+from pkgcore.fs import fs, livefs
+from pkgcore.fs.contents import contentsSet
+from pkgcore.merge import errors
+from pkgcore.merge import triggers as merge_triggers
+
+from ..merge.util import fake_engine
+
+
+class TestCollapseEnvd:
+
+    def write(self, path, name, content):
+        (path / name).write_text(textwrap.dedent(content))
+
+    def test_missing(self, tmp_path):
+        d, inc, colon = triggers.collapse_envd(str(tmp_path / 'nonexistent'))
+        assert d == {}
+        assert inc == triggers.incrementals | triggers.colon_parsed
+        assert colon == triggers.colon_parsed
+
+    def test_collapse(self, tmp_path):
+        self.write(tmp_path, '00basic', '''\
+            PATH="/usr/bin:/bin"
+            CONFIG_PROTECT="/etc /usr/share/config"
+            EDITOR="/bin/nano"
+            FOO="a:b"
+            COLON_SEPARATED="FOO"
+            ''')
+        self.write(tmp_path, '50extra', '''\
+            PATH="/opt/bin::/usr/bin"
+            CONFIG_PROTECT="  /var/lib/foo  "
+            EDITOR="/usr/bin/vim"
+            FOO=":c"
+            ''')
+        # ignored files
+        self.write(tmp_path, '50extra~', 'EDITOR="/bin/ed"\n')
+        self.write(tmp_path, 'noprefix', 'EDITOR="/bin/ed"\n')
+
+        d, inc, colon = triggers.collapse_envd(str(tmp_path))
+        assert d['PATH'] == ['/usr/bin', '/bin', '/opt/bin', '/usr/bin']
+        assert d['CONFIG_PROTECT'] == ['/etc', '/usr/share/config', '/var/lib/foo']
+        assert d['EDITOR'] == '/usr/bin/vim'
+        assert d['FOO'] == ['a', 'b', 'c']
+        assert 'FOO' in colon
+        assert 'FOO' in inc
+
+    def test_cache(self, tmp_path):
+        self.write(tmp_path, '00basic', 'EDITOR="/bin/nano"\n')
+        cache = {}
+        assert triggers.collapse_envd(str(tmp_path), cache)[0] == {'EDITOR': '/bin/nano'}
+        assert list(cache) == [str(tmp_path / '00basic')]
+        # cached parses are reused as is
+        self.write(tmp_path, '00basic', 'EDITOR="/usr/bin/vim"\n')
+        assert triggers.collapse_envd(str(tmp_path), cache)[0] == {'EDITOR': '/bin/nano'}
+        # and without a cache files are always reparsed
+        assert triggers.collapse_envd(str(tmp_path))[0] == {'EDITOR': '/usr/bin/vim'}
+        self.write(tmp_path, '10other', 'PAGER="less"\n')
+        assert triggers.collapse_envd(str(tmp_path), cache)[0] == {
+            'EDITOR': '/bin/nano', 'PAGER': 'less'}
+
+    def test_hook_cache(self):
+        assert triggers._hook_envd_cache(fake_engine()) is None
+        engine = fake_engine(hook_cache={})
+        cache = triggers._hook_envd_cache(engine)
+        assert cache == {}
+        assert triggers._hook_envd_cache(engine) is cache
+
+
+class TestPerformEnvUpdate:
+
+    def test_profile_files(self, tmp_path):
+        (envd := tmp_path / 'etc' / 'env.d').mkdir(parents=True)
+        (envd / '00basic').write_text('PATH="/usr/bin:/bin"\nLDPATH="/usr/lib"\nEDITOR="nano"\n')
+        triggers.perform_env_update(str(tmp_path), skip_ldso_update=True)
+        assert (tmp_path / 'etc' / 'profile.env').read_text().splitlines() == [
+            '# autogenerated.  update env.d instead',
+            'export EDITOR="nano"',
+            'export PATH="/usr/bin:/bin"',
+        ]
+        assert (tmp_path / 'etc' / 'profile.csh').read_text().splitlines() == [
+            '# autogenerated, update env.d instead',
+            'setenv EDITOR="nano"',
+            'setenv PATH="/usr/bin:/bin"',
+        ]
+        assert not (tmp_path / 'etc' / 'ld.so.conf').exists()
+
+    def test_ldso(self, tmp_path):
+        (envd := tmp_path / 'etc' / 'env.d').mkdir(parents=True)
+        (envd / '00basic').write_text('LDPATH="/usr/lib:/usr/local/lib"\n')
+        (envd / '50extra').write_text('LDPATH="/opt/lib"\n')
+        triggers.perform_env_update(str(tmp_path))
+        assert (tmp_path / 'etc' / 'ld.so.conf').read_text().splitlines() == [
+            '# automatically generated, edit env.d files instead',
+            '/usr/lib', '/usr/local/lib', '/opt/lib',
+        ]
+
+
+class TestSimpleChksumCompare:
+
+    def mk(self, **chksums):
+        return fs.fsFile('/foo', chksums=chksums, strict=False)
+
+    def test_compare(self):
+        compare = triggers.simple_chksum_compare
+        assert compare(self.mk(sha1=1, size=2), self.mk(sha1=1, size=2))
+        assert not compare(self.mk(sha1=1, size=2), self.mk(sha1=2, size=2))
+        assert not compare(self.mk(sha1=1, size=2), self.mk(sha1=1, size=3))
+        # only common chksums are compared
+        assert compare(self.mk(sha1=1, md5=1), self.mk(sha1=1, sha256=2))
+        assert compare(self.mk(sha1=1, size=2), self.mk(md5=1, size=2))
+        # nothing in common
+        assert not compare(self.mk(sha1=1), self.mk(md5=1))
+        assert not compare(self.mk(), self.mk())
+
+    def test_size_mismatch(self, tmp_path, monkeypatch):
+        (tmp_path / 'a').write_text('foo')
+        (tmp_path / 'b').write_text('foobar')
+        (tmp_path / 'c').write_text('bar')
+        a, b, c = (livefs.gen_obj(str(tmp_path / x)) for x in 'abc')
+        with monkeypatch.context() as m:
+            # differing sizes shouldn't require computing any chksums
+            m.setattr(fs, 'get_chksums', pytest.fail)
+            assert not triggers.simple_chksum_compare(a, b)
+            assert not triggers.simple_chksum_compare(b, self.mk(size=3))
+        assert not triggers.simple_chksum_compare(a, c)
+        assert triggers.simple_chksum_compare(a, livefs.gen_obj(str(tmp_path / 'a')))
+
+
+class TestConfigProtectInstall:
+
+    def test_trigger(self, tmp_path):
+        (etc := tmp_path / 'etc').mkdir()
+        (etc / 'foo.conf').write_text('old')
+        (etc / 'bar.conf').write_text('old')
+        # existing pending update matching the new content gets reused
+        (etc / '._cfg0000_foo.conf').write_text('stale')
+        (etc / '._cfg0001_foo.conf').write_text('new')
+        (etc / '._cfg0003_bar.conf').write_text('stale')
+        (etc / '._cfgXXXX_bar.conf').write_text('stale')
+
+        (image := tmp_path / 'image').mkdir()
+        (image / 'foo.conf').write_text('new')
+        (image / 'bar.conf').write_text('new')
+
+        engine = fake_engine(offset=str(tmp_path))
+        existing = contentsSet(
+            livefs.gen_obj(f'/etc/{x}', real_location=str(etc / x))
+            for x in ('foo.conf', 'bar.conf'))
+        install = contentsSet(
+            livefs.gen_obj(f'/etc/{x}', real_location=str(image / x))
+            for x in ('foo.conf', 'bar.conf'))
+        trigger = triggers.ConfigProtectInstall()
+        trigger.trigger(engine, existing, install)
+        assert sorted(x.location for x in install) == [
+            str(etc / '._cfg0001_foo.conf'), str(etc / '._cfg0004_bar.conf')]
+
+
+class TestConfigProtectFilter:
+
+    def test_filter(self, tmp_path):
+        (envd := tmp_path / 'etc' / 'env.d').mkdir(parents=True)
+        (envd / '00basic').write_text(
+            'CONFIG_PROTECT="/usr/share/config /etc"\n'
+            'CONFIG_PROTECT_MASK="/etc/env.d /etc/gconf/"\n')
+        match = triggers.gen_config_protect_filter(
+            str(tmp_path), extra_protects=['/var/lib/foo/'],
+            extra_disables=['/etc/env.d//']).match
+        for path in ('/etc/foo', '/usr/share/config/bar', '/var/lib/foo/baz'):
+            assert match(path)
+        for path in ('/etc/env.d/00basic', '/etc/gconf/foo', '/usr/bin/foo', '/etcfoo'):
+            assert not match(path)
+
+        # defaults to protecting /etc
+        match = triggers.gen_config_protect_filter(str(tmp_path / 'nonexistent')).match
+        assert match('/etc/foo')
+        assert not match('/usr/bin/foo')
+
+
+class TestCollisionProtect:
+
+    def test_trigger(self, tmp_path):
+        engine = fake_engine(offset=str(tmp_path))
+        files = {x: fs.fsFile(x, strict=False) for x in (
+            '/usr/bin/foo', '/usr/bin/bar', '/usr/lib/old', '/etc/foo.conf',
+            '/usr/share/ignored', '/usr/lib/.keep')}
+        existing = contentsSet(files.values())
+        existing.add(fs.fsDir('/usr/bin', strict=False))
+        install = contentsSet([fs.fsDir('/usr/bin', strict=False)])
+        old_cset = contentsSet([files['/usr/lib/old']])
+        trigger = triggers.CollisionProtect(extra_ignores=['/usr/share/*'])
+
+        with pytest.raises(errors.BlockModification) as excinfo:
+            trigger.trigger(engine, install, existing, old_cset)
+        assert str(excinfo.value).endswith(
+            "( file:/usr/bin/bar, file:/usr/bin/foo )")
+
+        for x in ('/usr/bin/foo', '/usr/bin/bar'):
+            existing.remove(x)
+        trigger.trigger(engine, install, existing, old_cset)
+
+
+class TestInstallMask:
+
+    def prune_func(self, install_mask, features=()):
+        domain = SimpleNamespace(
+            features=frozenset(features), binary_repos_raw=[], installed_repos=None)
+        gen = triggers.GenerateTriggers(domain, {'INSTALL_MASK': install_mask})
+        prune = [x for x in gen if isinstance(x, merge_triggers.PruneFiles)]
+        if not prune:
+            return None
+        assert len(prune) == 1
+        return prune[0].sentinel
+
+    def test_no_masks(self):
+        assert self.prune_func('') is None
+
+    def test_masks(self):
+        func = self.prune_func(
+            '/etc/foo.conf /usr/lib/*.la /opt/bar/', features=['nodoc'])
+        for path in (
+                # exact matches
+                '/etc/foo.conf', '/usr/lib/libfoo.la', '/opt/bar', '/usr/share/doc',
+                # directory prefix matches
+                '/opt/bar/baz', '/opt/bar/baz/qux', '/usr/share/doc/foo-1/README',
+                '/usr/lib/libfoo.la/nested'):
+            assert func(fs.fsFile(path, strict=False)), path
+        for path in (
+                # non-matching siblings
+                '/usr/share/docs', '/usr/share/docs/foo', '/usr/share/man/man1/foo.1',
+                '/etc/foo.conf.d', '/etc/foo', '/opt/barbaz', '/usr/lib/libfoo.so',
+                '/usr/lib/libfoo.lab'):
+            assert not func(fs.fsFile(path, strict=False)), path
+
+    def test_trigger(self):
+        func = self.prune_func('/usr/share/doc')
+        cset = contentsSet(fs.fsFile(x, strict=False) for x in (
+            '/usr/share/doc/foo/README', '/usr/share/docs/README', '/usr/bin/foo'))
+        merge_triggers.PruneFiles(func).trigger(fake_engine(observer=None), cset)
+        assert sorted(x.location for x in cset) == [
+            '/usr/bin/foo', '/usr/share/docs/README']
@@ -47,6 +47,14 @@ class TestContentsSet(TestCase):
         # making it mandatory
         self.assertEqual(len(contents.contentsSet()), 0)
 
+    def test_from_trusted(self):
+        cs = contents.contentsSet._from_trusted(iter(self.all))
+        self.assertEqual(cs, contents.contentsSet(self.all))
+        self.assertTrue(cs.mutable)
+        cs = contents.contentsSet._from_trusted(self.all, mutable=False)
+        self.assertFalse(cs.mutable)
+        self.assertRaises(AttributeError, cs.add, self.devs[0])
+
     def test_add(self):
         cs = contents.contentsSet(self.files + self.dirs, mutable=True)
         for x in self.links:
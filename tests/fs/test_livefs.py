@@ -59,6 +59,21 @@ class TestFsObjs:
         o = livefs.gen_obj(str(path))
         self.check_attrs(o, path)
 
+    def test_gen_obj_dev(self):
+        st = os.lstat("/dev/null")
+        o = livefs.gen_obj("/dev/null")
+        assert fs.isdev(o)
+        assert o.mode == st.st_mode
+        assert (o.major, o.minor) == fs.get_major_minor(st)
+        assert (o.uid, o.gid, o.mtime) == (st.st_uid, st.st_gid, st.st_mtime)
+
+    def test_gen_obj_overrides(self, tmp_path):
+        (path := tmp_path / "reg_obj").touch()
+        o = livefs.gen_obj(str(path), mode=0o600, uid=1234)
+        assert (o.mode, o.uid) == (0o600, 1234)
+        assert o.gid == path.lstat().st_gid
+        assert o.data.path == str(path)
+
     def test_iterscan(self, tmp_path):
         (path := tmp_path / "iscan").mkdir()
         files = [path / x for x in ("tmp", "blah", "dar")]
@@ -89,6 +104,30 @@ class TestFsObjs:
             seen.append(obj.location)
         assert [str(files[0])] == sorted(seen)
 
+    def test_iterscan_follow_symlinks(self, tmp_path):
+        (tmp_path / "dir").mkdir()
+        (tmp_path / "link").symlink_to("dir")
+        (tmp_path / "dangling").symlink_to("nonexistent")
+        objs = {Path(x.location).name: x for x in livefs.iter_scan(str(tmp_path))}
+        assert fs.issym(objs["link"])
+        assert fs.issym(objs["dangling"])
+        objs = {Path(x.location).name: x for x in
+                livefs.iter_scan(str(tmp_path), follow_symlinks=True)}
+        assert fs.isdir(objs["link"])
+        assert fs.issym(objs["dangling"])
+
+    def test_iterscan_offset_subdir(self, tmp_path):
+        # the top-level obj must come from the real path, not the offset
+        # stripped location
+        (path := tmp_path / "sub").mkdir()
+        path.chmod(0o750)
+        (path / "file").touch()
+        objs = list(livefs.iter_scan(str(path), offset=str(tmp_path)))
+        assert [x.location for x in objs] == ["/sub", "/sub/file"]
+        assert fs.isdir(objs[0])
+        for obj in objs:
+            self.check_attrs(obj, Path(obj.location).relative_to('/'), offset=tmp_path)
+
     def test_sorted_scan(self, tmp_path):
         for x in ("tmp", "blah", "dar"):
             (tmp_path / x).touch()
@@ -138,3 +177,23 @@ class TestFsObjs:
         assert not list(livefs.intersect(cset))
         cset = contentsSet([fs.fsDir('reg', strict=False)])
         assert not list(livefs.intersect(cset))
+
+    def test_recursively_fill_syms(self, tmp_path):
+        (tmp_path / "target").touch()
+        (tmp_path / "dir").mkdir()
+        (tmp_path / "link3").symlink_to("target")
+        (tmp_path / "link2").symlink_to("link3")
+        (tmp_path / "link1").symlink_to("link2")
+        (tmp_path / "dirlink").symlink_to("dir")
+        (tmp_path / "dangling").symlink_to("nonexistent")
+        cset = contentsSet(livefs.gen_obj(str(tmp_path / x))
+                           for x in ("link1", "dirlink", "dangling"))
+        livefs.recursively_fill_syms(cset)
+        assert sorted(x.location for x in cset) == [
+            str(tmp_path / x) for x in
+            ("dangling", "dir", "dirlink", "link1", "link2", "link3", "target")]
+
+        cset = contentsSet([livefs.gen_obj(str(tmp_path / "link1"))])
+        livefs.recursively_fill_syms(cset, limiter=fs.fsDir)
+        assert sorted(x.location for x in cset) == [
+            str(tmp_path / x) for x in ("link1", "link2", "link3")]
@@ -0,0 +1,83 @@
+import os
+import signal
+import threading
+
+import pytest
+from pkgcore.util.thread_pool import map_async
+
+
+def _consume(iterable, *args, **kwds):
+    for x in iterable:
+        yield (x, args, kwds)
+
+
+class TestMapAsync:
+
+    @pytest.mark.parametrize('threads', (1, 2, 4))
+    def test_all_items_processed(self, threads):
+        results = map_async(range(100), _consume, 'a', threads=threads, foo=1)
+        assert sorted(x[0] for x in results) == list(range(100))
+        assert all(x[1:] == (('a',), {'foo': 1}) for x in results)
+
+    def test_generator_input(self):
+        results = map_async((x for x in range(50)), _consume, threads=3)
+        assert sorted(x[0] for x in results) == list(range(50))
+
+    def test_empty(self):
+        assert not map_async([], _consume, threads=4)
+
+    def test_per_thread_args(self):
+        count = iter(range(100))
+        lock = threading.Lock()
+
+        def per_thread_args():
+            with lock:
+                return (next(count),)
+
+        def per_thread_kwds():
+            return {'kwd': True}
+
+        results = map_async(
+            range(20), _consume, threads=2,
+            per_thread_args=per_thread_args, per_thread_kwds=per_thread_kwds)
+        assert sorted(x[0] for x in results) == list(range(20))
+        assert {x[1] for x in results} <= {(0,), (1,)}
+        assert all(x[2] == {'kwd': True} for x in results)
+
+    def test_non_generator_results(self):
+        def functor(iterable):
+            return sum(iterable)
+
+        assert sum(map_async(range(100), functor, threads=3)) == sum(range(100))
+
+    def test_worker_exception(self):
+        def functor(iterable):
+            for x in iterable:
+                if x == 5:
+                    raise ValueError('bad item')
+
+        with pytest.raises(ValueError, match='bad item'):
+            map_async(range(10), functor, threads=2)
+
+    @pytest.mark.parametrize('batch_size', (1, 7, 1000))
+    def test_batch_size(self, batch_size):
+        results = map_async(range(100), _consume, threads=3, batch_size=batch_size)
+        assert sorted(x[0] for x in results) == list(range(100))
+
+    @pytest.mark.parametrize('threads', (1, 2))
+    def test_interrupt_reaches_main_thread(self, threads):
+        # functors like regen_iter() swallow KeyboardInterrupt, relying on
+        # SIGINT being delivered to the main thread rather than to them
+        def functor(iterable):
+            try:
+                for x in iterable:
+                    os.kill(os.getpid(), signal.SIGINT)
+            except KeyboardInterrupt:
+                return
+
+        with pytest.raises(KeyboardInterrupt):
+            map_async([1], functor, threads=threads)
+
+    def test_default_parallelism(self):
+        results = map_async(range(100), _consume)
+        assert sorted(x[0] for x in results) == list(range(100))